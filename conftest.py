@@ -31,6 +31,6 @@ def data_for_check_year_parameter():
             else:
                 control_data_day = day
 
-            data = (day_month, {"day": control_data_day, "month": control_data_month})
+            data = (day_month, (control_data_day, control_data_month))
             test_data.append(data)
     return test_data
@@ -4,42 +4,58 @@
 Collection of calculation function for main app to calculate the energy for device
 in Daily, monthly, and yearly rhythm.
 """
+import os
 import re
-import json
+import calendar
+from functools import lru_cache
 from datetime import datetime, timedelta
+from typing import Optional
 from dateutil.relativedelta import relativedelta
 
+try:
+    import orjson as json_parser
+except ImportError:
+    import json as json_parser
+
 from source.constants import CONFIGURATION_FILE_PATH
 from source import support_functions as sf
 from source import logging_helper as lh
 
-TIME_OF_DAY_SCHEDULE_MATCH = r"^(?:[01]\d|2[0-3]):(?:[0-5]\d)$"
-DAY_OF_MONTH_SCHEDULE_MATCH = r"^[\d]{2}$"
-DATE_OF_YEAR_SCHEDULE_MATCH = r"^[\d]{2}[.][\d]{2}$"
-TIMESTAMP_FORMAT_INPUT = "%Y-%m-%dT%H:%M:%S.%fZ"
-TIMESTAMP_FORMAT_OUTPUT = "%Y-%m-%dT%H:%M:%S"
-configuration_failed_message_send = {"FileNotFoundError": False, "ValueError": False}
+TIME_OF_DAY_SCHEDULE_MATCH = re.compile(r"^(?:[01]\d|2[0-3]):(?:[0-5]\d)$")
+MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+MONTH_PARAMETERS = {f"{value:02d}": value if 1 <= value <= 12 else 1 for value in range(100)}
+DAY_PARAMETERS = {f"{value:02d}": value if 1 <= value <= 31 else 1 for value in range(100)}
+PERIOD_TIME_DIFFERENCES = {
+    "day": timedelta(days=1),
+    "month": relativedelta(months=1),
+    "year": relativedelta(years=1),
+}
+_config_cache = {"mtime": None, "size": None, "data": None}
 
 
-def check_cost_calc_request_time() -> str:
+def _load_config() -> dict:
     """
-    Check if a start time is given for cost calculation and have the right format. If something is
-    wrong, a default time is returned.
-    :return: Start time in string format
+    Load the general configuration and keep it in a cache. The file is only read and parsed again
+    if its modification time or size has changed since the last call. If the file is missing or
+    not valid, a log entry is written once and an empty configuration is cached.
+    :return: Parsed configuration as a dict
     """
     try:
-        checked_requested_start_time = "00:00"
-        with open(CONFIGURATION_FILE_PATH, encoding="utf-8") as file:
-            data = json.load(file)
-            if ("general" in data) and ("cost_calc_request_time" in data["general"]):
-                requested_start_time = data["general"]["cost_calc_request_time"]
-                if (
-                    re.search(TIME_OF_DAY_SCHEDULE_MATCH, requested_start_time)
-                    is not None
-                ):
-                    checked_requested_start_time = requested_start_time
-        return checked_requested_start_time
-
+        file_stat = os.stat(CONFIGURATION_FILE_PATH)
+        mtime, size = file_stat.st_mtime_ns, file_stat.st_size
+    except FileNotFoundError:
+        mtime, size = None, None
+    data = _config_cache["data"]
+    if (
+        data is not None
+        and _config_cache["mtime"] == mtime
+        and _config_cache["size"] == size
+    ):
+        return data
+    data = {}
+    try:
+        with open(CONFIGURATION_FILE_PATH, "rb") as file:
+            data = json_parser.loads(file.read())
     except FileNotFoundError as err:
         error_message = (
             f"The file for general configuration could not be found. Please put "
@@ -47,10 +63,29 @@ def check_cost_calc_request_time() -> str:
             f"default values are used. Error occurred during start the app with "
             f"error message: {err}."
         )
-        if not configuration_failed_message_send[FileNotFoundError]:
-            lh.write_log(lh.LoggingLevel.WARNING.value, error_message)
-            configuration_failed_message_send[FileNotFoundError] = True
-        return checked_requested_start_time
+        lh.write_log(lh.LoggingLevel.WARNING.value, error_message)
+    except ValueError as err:
+        error_message = (
+            f"The file for general configuration is not a valid JSON file. The default "
+            f"values are used. Error message: {err}"
+        )
+        lh.write_log(lh.LoggingLevel.WARNING.value, error_message)
+    _config_cache.update({"mtime": mtime, "size": size, "data": data})
+    return data
+
+
+def check_cost_calc_request_time() -> str:
+    """
+    Check if a start time is given for cost calculation and have the right format. If something is
+    wrong, a default time is returned.
+    :return: Start time in string format
+    """
+    checked_requested_start_time = "00:00"
+    general = _load_config().get("general")
+    if general and (requested_start_time := general.get("cost_calc_request_time")):
+        if TIME_OF_DAY_SCHEDULE_MATCH.match(requested_start_time) is not None:
+            checked_requested_start_time = requested_start_time
+    return checked_requested_start_time
 
 
 def check_cost_config() -> float:
@@ -61,101 +96,67 @@ def check_cost_config() -> float:
     """
     default_price = 0.3
     try:
-        with open(CONFIGURATION_FILE_PATH, encoding="utf-8") as file:
-            data = json.load(file)
-            if ("general" in data) and ("price_kwh" in data["general"]):
-                requested_kwh_price = data["general"]["price_kwh"]
-                if not isinstance(requested_kwh_price, float):
-                    requested_kwh_price = requested_kwh_price.replace(",", ".")
-                checked_requested_kwh_price = round(float(requested_kwh_price), 3)
+        checked_requested_kwh_price = default_price
+        general = _load_config().get("general")
+        if general and (requested_kwh_price := general.get("price_kwh")) is not None:
+            if not isinstance(requested_kwh_price, float):
+                requested_kwh_price = requested_kwh_price.replace(",", ".")
+            checked_requested_kwh_price = round(float(requested_kwh_price), 3)
         return checked_requested_kwh_price
 
-    except FileNotFoundError as err:
-        error_message = (
-            f"The file for general configuration could not be found. Please put "
-            f"it in the folder you passed with the environment variables. The "
-            f"default values are used. Error occurred during start the app with "
-            f"error message: {err}."
-        )
-        if not configuration_failed_message_send[FileNotFoundError]:
-            lh.write_log(lh.LoggingLevel.WARNING.value, error_message)
-            configuration_failed_message_send[FileNotFoundError] = True
-        return default_price
     except ValueError as err:
         error_message = (
             f"The setting for the price is not a number. A default value of 0.30€ "
             f"was assumed. Error message: {err}"
         )
-        if not configuration_failed_message_send[ValueError]:
-            lh.write_log(lh.LoggingLevel.WARNING.value, error_message)
-            configuration_failed_message_send[ValueError] = True
+        lh.write_log(lh.LoggingLevel.WARNING.value, error_message)
         return default_price
 
 
 def cost_calc(
     device_name: str,
     settings: dict,
-    current_timestamp: datetime,
-    time_difference: relativedelta,
+    period: str,
+    tick: dict,
+    measurement_summary: tuple,
 ) -> None:
     """
-    Calculate the monthly cost for a specific device.
+    Calculate the cost of the given period for a specific device.
     :param device_name: Name of the device
     :param settings: device parameters
-    :param current_timestamp: Now date and time from request
-    :param time_difference: needed time difference for calculation
+    :param period: Period for calculation, one of "day", "month" or "year"
+    :param tick: Values of the current scheduler run which are shared by all devices
+    :param measurement_summary: Energy in Wh, number of successful and failed measurements
     :return: None
     """
-    start_date = current_timestamp - time_difference
-    start_date_format = start_date.strftime("%Y-%m-%d %H:%M:%S")
-    end_date = current_timestamp
-    end_date_format = end_date.strftime("%Y-%m-%d %H:%M:%S")
-
-    result = sf.fetch_measurements(
-        {
-            "device": device_name,
-            "target_date": start_date_format,
-            "current_date": end_date_format,
-        }
-    )
-
-    success_measurements = list(
-        filter(
-            lambda measurement: measurement["fetch_success"] is True,
-            result.get_points(),
-        )
-    )
-    failed_measurements = list(
-        filter(
-            lambda measurement: measurement["fetch_success"] is False,
-            result.get_points(),
-        )
-    )
-    sum_of_energy_in_kwh = round(
-        (sum(element["energy_wh"] for element in success_measurements) / 1000), 2
-    )
-    cost_kwh = check_cost_config()
-    if (len(success_measurements) + len(failed_measurements)) == 0:
+    sum_of_energy_in_wh, success_count, failed_count = measurement_summary
+    total_count = success_count + failed_count
+    if total_count == 0:
         return
-    max_values = ((end_date - start_date).total_seconds()) / settings["update_time"]
+    time_range = tick["time_ranges"][period]
+    sum_of_energy_in_kwh = round(sum_of_energy_in_wh / 1000, 2)
+    received_values_share = success_count * settings["update_time"] / time_range["seconds"]
 
     data = {
-        "start_date": start_date_format,
-        "end_date": end_date_format,
+        "start_date": time_range["start_date_format"],
+        "end_date": time_range["end_date_format"],
         "sum_of_energy": sum_of_energy_in_kwh,
-        "total_cost": sum_of_energy_in_kwh * cost_kwh,
-        "cost_kwh": cost_kwh,
-        "error_rate_one": len(failed_measurements)
-        * 100
-        / (len(success_measurements) + len(failed_measurements)),
-        "error_rate_two": (max_values - len(success_measurements)) * 100 / max_values,
+        "total_cost": sum_of_energy_in_kwh * tick["cost_kwh"],
+        "cost_kwh": tick["cost_kwh"],
+        "error_rate_one": failed_count * 100 / total_count,
+        "error_rate_two": (1 - received_values_share) * 100,
     }
-    if time_difference.days == 1:
-        sf.cost_logging(device_name + "_day", data)
-    elif time_difference.months == 1:
-        sf.cost_logging(device_name + "_month", data)
-    elif time_difference.years == 1:
-        sf.cost_logging(device_name + "_year", data)
+    sf.cost_logging(f"{device_name}_{period}", data)
+
+
+def days_in_month(year: int, month: int) -> int:
+    """
+    Functions calculate the number of days in the provided month.
+    :param year: Year of the month, needed for leap years.
+    :param month: Month from which the number of days is to be returned.
+    :return: Returns the number of days which is also the last day of the month.
+    """
+    return MONTH_DAYS[month - 1] + (month == 2 and calendar.isleap(year))
 
 
 def last_day_of_month(date) -> datetime:
@@ -164,9 +165,7 @@ def last_day_of_month(date) -> datetime:
     :param date: Date from which the last day is to be returned.
     :return: Returns a date with changed day which is the last of the month.
     """
-    if date.month == 12:
-        return date.replace(day=31)
-    return date.replace(month=date.month + 1, day=1) - timedelta(days=1)
+    return date.replace(day=days_in_month(date.year, date.month))
 
 
 def check_month_parameter(month: str) -> int:
@@ -175,6 +174,9 @@ def check_month_parameter(month: str) -> int:
     :param month: Parameter for month calculation as String
     :return: Returns the plausibility value as Integer
     """
+    checked_month = MONTH_PARAMETERS.get(month)
+    if checked_month is not None:
+        return checked_month
     checked_month = int(month)
     if checked_month < 1 or checked_month > 12:
         return 1
@@ -189,29 +191,57 @@ def check_day_parameter(day: str) -> int:
     :param day: Parameter for day calculation as String
     :return: Returns the plausibility value as Integer
     """
+    checked_day = DAY_PARAMETERS.get(day)
+    if checked_day is not None:
+        return checked_day
     checked_day = int(day)
     if checked_day < 1 or checked_day > 31:
         return 1
     return checked_day
 
 
-def check_year_parameter(day_month: str) -> dict:
+def check_year_parameter(day_month: str) -> tuple:
     """
     Check the day and month parameter and set default value if it is not plausible.
     :param day_month: Parameter year calculation as String
-    :return: Returns the plausibility values in a List
+    :return: Returns the plausibility values of day and month as a tuple
     """
-    values = {"day": 1, "month": 1}
     split_date = day_month.split(".")
-    values["month"] = check_month_parameter(split_date[1])
-    values["day"] = check_day_parameter(split_date[0])
-    return values
+    return check_day_parameter(split_date[0]), check_month_parameter(split_date[1])
 
 
-def check_cost_calc_requested(settings: dict) -> dict:
+def check_day_of_month_format(value: str) -> bool:
     """
-    Check if a cost calculation is requested for this device and if it has the correct formatting.
-    :param settings: Settings for the selected device
+    Check if the parameter consists of exactly two digits like "01". Used for the day of the
+    monthly calculation as well as for both parts of the yearly "DD.MM" parameter.
+    :param value: Two-digit day or month parameter as String
+    :return: Format matched as a boolean.
+    """
+    return len(value) == 2 and value.isascii() and value.isdigit()
+
+
+def check_date_of_year_format(day_month: str) -> bool:
+    """
+    Check if the day and month parameter has the format "DD.MM" like "01.12".
+    :param day_month: Parameter for year calculation as String
+    :return: Format matched as a boolean.
+    """
+    day, separator, month = day_month.partition(".")
+    return (
+        separator == "."
+        and check_day_of_month_format(day)
+        and check_day_of_month_format(month)
+    )
+
+
+@lru_cache(maxsize=128)
+def resolve_cost_calc_request(cost_calc_day, cost_calc_month, cost_calc_year) -> dict:
+    """
+    Check the cost calculation parameters of a device and if they have the correct formatting.
+    The result is cached for each combination of parameters.
+    :param cost_calc_day: Parameter for daily calculation
+    :param cost_calc_month: Parameter for monthly calculation as String
+    :param cost_calc_year: Parameter for yearly calculation as String
     :return: The requested calculations in a dict
     """
     start_schedule_task = {
@@ -220,50 +250,56 @@ def check_cost_calc_requested(settings: dict) -> dict:
         "cost_month": None,
         "cost_year": None,
     }
-    if ("cost_calc_day" in settings) and (settings["cost_calc_day"]):
+    if cost_calc_day:
         start_schedule_task["cost_day"] = True
-        start_schedule_task["start_schedule_task"] |= True
-    if "cost_calc_month" in settings:
-        if (
-            re.search(DAY_OF_MONTH_SCHEDULE_MATCH, settings["cost_calc_month"])
-            is not None
-        ):
-            start_schedule_task["cost_month"] = check_month_parameter(
-                settings["cost_calc_month"]
-            )
-            start_schedule_task["start_schedule_task"] |= True
-    if "cost_calc_year" in settings:
-        if (
-            re.search(DATE_OF_YEAR_SCHEDULE_MATCH, settings["cost_calc_year"])
-            is not None
-        ):
-            start_schedule_task["cost_year"] = check_year_parameter(
-                settings["cost_calc_year"]
-            )
-            start_schedule_task["start_schedule_task"] |= True
+        start_schedule_task["start_schedule_task"] = True
+    if cost_calc_month is not None:
+        if check_day_of_month_format(cost_calc_month):
+            start_schedule_task["cost_month"] = check_month_parameter(cost_calc_month)
+            start_schedule_task["start_schedule_task"] = True
+    if cost_calc_year is not None:
+        if check_date_of_year_format(cost_calc_year):
+            start_schedule_task["cost_year"] = check_year_parameter(cost_calc_year)
+            start_schedule_task["start_schedule_task"] = True
     return start_schedule_task
 
 
-def check_matched_day(current_date: datetime, target_day: int) -> bool:
+def check_cost_calc_requested(settings: dict) -> dict:
+    """
+    Check if a cost calculation is requested for this device and if it has the correct formatting.
+    :param settings: Settings for the selected device
+    :return: The requested calculations in a dict
+    """
+    return dict(
+        resolve_cost_calc_request(
+            settings.get("cost_calc_day"),
+            settings.get("cost_calc_month"),
+            settings.get("cost_calc_year"),
+        )
+    )
+
+
+def check_matched_day(
+    current_date: datetime, target_day: int, last_day: Optional[int] = None
+) -> bool:
     """
     Checks if the current day matches the set day. In addition, if the set day is not possible,
     the last day in this month is checked.
     :param current_date: Current timestamp.
     :param target_day: Target day for the calculation.
+    :param last_day: Last day of the current month, calculated if not given.
     :return: Day matched as a boolean.
     """
-    last_day_of_current_month = last_day_of_month(current_date)
-    if target_day > last_day_of_current_month.day:
-        if current_date.day == last_day_of_current_month.day:
-            return True
-    else:
-        if current_date.day == target_day:
-            return True
-    return False
+    if last_day is None:
+        last_day = days_in_month(current_date.year, current_date.month)
+    return current_date.day == min(target_day, last_day)
 
 
 def check_matched_day_and_month(
-    current_date: datetime, target_day: int, target_month: int
+    current_date: datetime,
+    target_day: int,
+    target_month: int,
+    last_day: Optional[int] = None,
 ) -> bool:
     """
     Checks if the current day and month matches the set date. In addition, if the set day is not
@@ -271,9 +307,10 @@ def check_matched_day_and_month(
     :param current_date: Current timestamp.
     :param target_day: Target day for the calculation.
     :param target_month: Target month for the calculation.
+    :param last_day: Last day of the current month, calculated if not given.
     :return: Day matched as a boolean.
     """
-    if check_matched_day(current_date, target_day):
+    if check_matched_day(current_date, target_day, last_day):
         if current_date.month == target_month:
             return True
     return False
@@ -283,38 +320,67 @@ def cost_calc_handler(
     device_name: str,
     settings: dict,
     cost_calc_requested: dict,
+    tick: dict,
 ) -> None:
     """
     Check with costs are requested and call the correct calculations.
     :param device_name: Name of the device
     :param settings: device parameters
     :param cost_calc_requested: Structure which calculations are requested
+    :param tick: Values of the current scheduler run which are shared by all devices
     :return: None
     """
-
-    current_timestamp = datetime.utcnow()
+    current_timestamp = tick["current_timestamp"]
+    periods = []
     if cost_calc_requested["cost_day"]:
-        cost_calc(
-            device_name,
-            settings,
-            current_timestamp,
-            relativedelta(days=1),
-        )
+        periods.append("day")
     if cost_calc_requested["cost_month"] is not None:
-        if check_matched_day(current_timestamp, cost_calc_requested["cost_month"]):
-            cost_calc(
-                device_name,
-                settings,
-                current_timestamp,
-                relativedelta(months=1),
-            )
+        if check_matched_day(
+            current_timestamp, cost_calc_requested["cost_month"], tick["last_day"]
+        ):
+            periods.append("month")
     if cost_calc_requested["cost_year"] is not None:
+        target_day, target_month = cost_calc_requested["cost_year"]
         if check_matched_day_and_month(
-            current_timestamp,
-            cost_calc_requested["cost_year"]["day"],
-            cost_calc_requested["cost_year"]["month"],
+            current_timestamp, target_day, target_month, tick["last_day"]
         ):
-            cost_calc(device_name, settings, current_timestamp, relativedelta(years=1))
+            periods.append("year")
+    if not periods:
+        return
+    measurement_summaries = sf.fetch_aggregated(
+        device_name, {period: tick["time_ranges"][period] for period in periods}
+    )
+    for period in periods:
+        cost_calc(device_name, settings, period, tick, measurement_summaries[period])
+
+
+def run_tick(devices: list) -> None:
+    """
+    Run the requested cost calculations of all devices. Timestamp, price and time ranges are
+    calculated once and shared by all devices.
+    :param devices: List of device name, settings and requested calculations as tuples
+    :return: None
+    """
+    current_timestamp = datetime.utcnow().replace(microsecond=0)
+    end_date_format = current_timestamp.isoformat(sep=" ", timespec="seconds")
+    time_ranges = {}
+    for period, time_difference in PERIOD_TIME_DIFFERENCES.items():
+        start_date = current_timestamp - time_difference
+        time_ranges[period] = {
+            "start_date": start_date,
+            "end_date": current_timestamp,
+            "start_date_format": start_date.isoformat(sep=" ", timespec="seconds"),
+            "end_date_format": end_date_format,
+            "seconds": (current_timestamp - start_date).total_seconds(),
+        }
+    tick = {
+        "current_timestamp": current_timestamp,
+        "last_day": days_in_month(current_timestamp.year, current_timestamp.month),
+        "cost_kwh": check_cost_config(),
+        "time_ranges": time_ranges,
+    }
+    for device_name, settings, cost_calc_requested in devices:
+        cost_calc_handler(device_name, settings, cost_calc_requested, tick)
 
 
 def main() -> None:
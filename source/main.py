@@ -73,6 +73,7 @@ def main() -> None:
         with open(DEVICES_FILE_PATH, encoding="utf-8") as file:
             data = json.load(file)
         request_start_time = cc.check_cost_calc_request_time()
+        cost_calc_devices = []
         for device_name, settings in data.items():
             if all(key in settings for key in keys):
                 device_settings = settings | {
@@ -84,12 +85,11 @@ def main() -> None:
                 )
             cost_calc_requested = cc.check_cost_calc_requested(settings)
             if cost_calc_requested["start_schedule_task"] is True:
-                schedule.every().day.at(request_start_time).do(
-                    cc.cost_calc_handler,
-                    device_name,
-                    settings,
-                    cost_calc_requested,
-                )
+                cost_calc_devices.append((device_name, settings, cost_calc_requested))
+        if cost_calc_devices:
+            schedule.every().day.at(request_start_time).do(
+                cc.run_tick, cost_calc_devices
+            )
 
         while True:
             schedule.run_pending()
@@ -4,6 +4,7 @@
 Collection of support function for main app with definition of classes and verification functions.
 """
 from dataclasses import dataclass
+import calendar
 import os
 import influxdb.resultset
 from requests.exceptions import ConnectTimeout
@@ -148,18 +149,92 @@ def cost_logging(file_name: str, data: dict) -> None:
         )
 
 
-def fetch_measurements(bind_params: dict) -> influxdb.resultset.ResultSet:
+def aggregation_query(db_name: str, fetch_success: bool, day_offset: int) -> str:
     """
-    Fetch measurements with transferred query parameters.
-    :param bind_params: Parameters for query
-    :return: All measurements which are matched tp parameters as a ResultSet
+    Create a query which counts the measurements per day. For successful measurements the
+    energy is summed up as well, failed measurements have no energy to sum.
+    :param db_name: Name of the database
+    :param fetch_success: Only measurements with this fetch result are aggregated
+    :param day_offset: Offset of the daily buckets to midnight in seconds
+    :return: Query as a string
     """
+    fields = 'count("fetch_success") AS count'
+    if fetch_success:
+        fields = f'sum("energy_wh") AS energy_wh, {fields}'
+    return (
+        f"SELECT {fields} "
+        f'FROM {db_name}."autogen"."census" '
+        f"WHERE device=$device AND fetch_success={str(fetch_success).lower()} "
+        f"AND time >= $target_date AND time < $current_date "
+        f"GROUP BY time(1d, {day_offset}s) fill(none)"
+    )
+
+
+def sum_buckets_per_period(
+    result: influxdb.resultset.ResultSet, start_epochs: dict
+) -> dict:
+    """
+    Sum up the daily buckets for each period which starts before or with the bucket. The raw
+    rows of the result are read directly, without creating a dict for each point.
+    :param result: Daily aggregated points with epoch time
+    :param start_epochs: Start of each period as epoch in seconds
+    :return: Energy in Wh and number of measurements as a list per period
+    """
+    sums = {period: [0.0, 0] for period in start_epochs}
+    for series in result.raw.get("series", []):
+        columns = series["columns"]
+        time_index = columns.index("time")
+        count_index = columns.index("count")
+        energy_index = columns.index("energy_wh") if "energy_wh" in columns else None
+        for row in series["values"]:
+            energy = (row[energy_index] or 0.0) if energy_index is not None else 0.0
+            for period, start_epoch in start_epochs.items():
+                if row[time_index] >= start_epoch:
+                    sums[period][0] += energy
+                    sums[period][1] += row[count_index]
+    return sums
+
+
+def fetch_aggregated(device: str, ranges: dict) -> dict:
+    """
+    Fetch the energy sum and the number of successful and failed measurements for several time
+    ranges of one device with a single request. All ranges must share the same end date and
+    differ by whole days, so the database can aggregate per day and the days are summed per range.
+    Each range is half-open, the start date is included and the end date is excluded.
+    :param device: Name of the device
+    :param ranges: Time ranges with start and end date as datetime for each requested period
+    :return: Energy in Wh, number of successful and failed measurements as a tuple per period
+    """
+    end_dates = {time_range["end_date"] for time_range in ranges.values()}
+    if len(end_dates) != 1:
+        raise ValueError("All time ranges for the aggregation must share the same end date.")
+    end_date = end_dates.pop()
+    start_epochs = {
+        period: calendar.timegm(time_range["start_date"].timetuple())
+        for period, time_range in ranges.items()
+    }
+    day_offset = end_date.hour * 3600 + end_date.minute * 60 + end_date.second
+    bind_params = {
+        "device": device,
+        "target_date": min(
+            time_range["start_date"] for time_range in ranges.values()
+        ).isoformat(sep=" ", timespec="seconds"),
+        "current_date": end_date.isoformat(sep=" ", timespec="seconds"),
+    }
     with InfluxDBConnection() as conn:
-        query = (
-            f'SELECT * FROM {conn.login_information.db_name}."autogen"."census" '
-            f"WHERE device=$device AND time > $target_date AND time < $current_date"
+        db_name = conn.login_information.db_name
+        success_result, failed_result = conn.query(
+            f"{aggregation_query(db_name, True, day_offset)}; "
+            f"{aggregation_query(db_name, False, day_offset)}",
+            bind_params=bind_params,
+            epoch="s",
         )
-        return conn.query(query, bind_params=bind_params)
+    success_sums = sum_buckets_per_period(success_result, start_epochs)
+    failed_sums = sum_buckets_per_period(failed_result, start_epochs)
+    return {
+        period: (success_sums[period][0], success_sums[period][1], failed_sums[period][1])
+        for period in ranges
+    }
 
 
 login_information = DataApp()
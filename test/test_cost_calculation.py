@@ -5,12 +5,18 @@ from datetime import datetime
 
 import pytest
 
+from source import cost_calculation
 from source.cost_calculation import (
+    days_in_month,
     last_day_of_month,
     check_month_parameter,
     check_day_parameter,
+    check_year_parameter,
     check_matched_day,
     check_matched_day_and_month,
+    check_day_of_month_format,
+    check_date_of_year_format,
+    check_cost_calc_requested,
 )
 
 
@@ -40,6 +46,26 @@ def test_last_day_of_month(parameter_1, parameter_2, expected):
     assert result == datetime(parameter_1, parameter_2, expected)
 
 
+@pytest.mark.parametrize(
+    "parameter_1, parameter_2, expected",
+    [
+        (2022, 1, 31),
+        (2022, 2, 28),
+        (2024, 2, 29),
+        (2100, 2, 28),
+        (2000, 2, 29),
+        (2022, 4, 30),
+        (2022, 12, 31),
+    ],
+)
+def test_days_in_month(parameter_1, parameter_2, expected):
+    """
+    Pure test for function days_in_month()
+    """
+    result = days_in_month(parameter_1, parameter_2)
+    assert result == expected
+
+
 @pytest.mark.parametrize(
     "parameter_1, expected",
     [
@@ -49,6 +75,10 @@ def test_last_day_of_month(parameter_1, parameter_2, expected):
         ("15", 15),
         ("31", 31),
         ("32", 1),
+        ("00", 1),
+        ("01", 1),
+        ("09", 9),
+        ("99", 1),
     ],
 )
 def test_check_day_parameter(parameter_1, expected):
@@ -68,6 +98,9 @@ def test_check_day_parameter(parameter_1, expected):
         ("5", 5),
         ("12", 12),
         ("13", 1),
+        ("00", 1),
+        ("07", 7),
+        ("31", 1),
     ],
 )
 def test_check_month_parameter(parameter_1, expected):
@@ -78,6 +111,26 @@ def test_check_month_parameter(parameter_1, expected):
     assert result == expected
 
 
+@pytest.mark.parametrize(
+    "parameter_1, expected",
+    [
+        ("00.00", (1, 1)),
+        ("01.01", (1, 1)),
+        ("12.12", (12, 12)),
+        ("13.13", (13, 1)),
+        ("31.12", (31, 12)),
+        ("32.01", (1, 1)),
+        ("99.99", (1, 1)),
+    ],
+)
+def test_check_year_parameter(parameter_1, expected):
+    """
+    Pure test for function check_year_parameter()
+    """
+    result = check_year_parameter(parameter_1)
+    assert result == expected
+
+
 @pytest.mark.parametrize(
     "parameter_1, parameter_2, expected",
     [
@@ -110,3 +163,170 @@ def test_check_matched_day_and_month(parameter_1, parameter_2, parameter_3, expe
     """
     result = check_matched_day_and_month(parameter_1, parameter_2, parameter_3)
     assert result == expected
+
+
+@pytest.mark.parametrize(
+    "parameter_1, expected",
+    [
+        ("01", True),
+        ("31", True),
+        ("1", False),
+        ("001", False),
+        ("-1", False),
+        ("a1", False),
+        ("\u00b2\u00b2", False),
+    ],
+)
+def test_check_day_of_month_format(parameter_1, expected):
+    """
+    Pure test for function check_day_of_month_format()
+    """
+    result = check_day_of_month_format(parameter_1)
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "parameter_1, expected",
+    [
+        ("01.01", True),
+        ("31.12", True),
+        ("1.01", False),
+        ("01.1", False),
+        ("01-01", False),
+        ("01.01.", False),
+        ("0101", False),
+    ],
+)
+def test_check_date_of_year_format(parameter_1, expected):
+    """
+    Pure test for function check_date_of_year_format()
+    """
+    result = check_date_of_year_format(parameter_1)
+    assert result == expected
+
+
+def test_check_cost_calc_requested():
+    """
+    Test that check_cost_calc_requested() returns an independent result for cached settings
+    """
+    settings = {"cost_calc_day": True, "cost_calc_month": "05", "cost_calc_year": "xx"}
+    result = check_cost_calc_requested(settings)
+    assert result == {
+        "start_schedule_task": True,
+        "cost_day": True,
+        "cost_month": 5,
+        "cost_year": None,
+    }
+    result["cost_day"] = False
+    assert check_cost_calc_requested(dict(settings))["cost_day"] is True
+
+
+def test_load_config_reloads_on_change(tmp_path, monkeypatch):
+    """
+    Test that _load_config() caches the parsed file and reloads it after a change
+    """
+    # pylint: disable=protected-access
+    config_file = tmp_path / "config.json"
+    config_file.write_text('{"general": {"price_kwh": 0.3}}', encoding="utf-8")
+    monkeypatch.setattr(cost_calculation, "CONFIGURATION_FILE_PATH", str(config_file))
+    monkeypatch.setattr(
+        cost_calculation,
+        "_config_cache",
+        {"mtime": None, "size": None, "data": None},
+    )
+    first_result = cost_calculation._load_config()
+    assert first_result == {"general": {"price_kwh": 0.3}}
+    assert cost_calculation._load_config() is first_result
+    config_file.write_text('{"general": {"price_kwh": 0.35}}', encoding="utf-8")
+    assert cost_calculation._load_config() == {"general": {"price_kwh": 0.35}}
+
+
+def test_load_config_missing_file(tmp_path, monkeypatch):
+    """
+    Test that _load_config() returns an empty configuration if the file is missing and
+    writes the warning only once
+    """
+    # pylint: disable=protected-access
+    logged_messages = []
+    config_file = tmp_path / "config.json"
+    monkeypatch.setattr(cost_calculation, "CONFIGURATION_FILE_PATH", str(config_file))
+    monkeypatch.setattr(
+        cost_calculation,
+        "_config_cache",
+        {"mtime": None, "size": None, "data": None},
+    )
+    monkeypatch.setattr(
+        cost_calculation.lh,
+        "write_log",
+        lambda level, message: logged_messages.append((level, message)),
+    )
+    assert cost_calculation._load_config() == {}
+    assert cost_calculation._load_config() == {}
+    assert len(logged_messages) == 1
+    assert logged_messages[0][0] == cost_calculation.lh.LoggingLevel.WARNING.value
+    config_file.write_text('{"general": {"price_kwh": 0.35}}', encoding="utf-8")
+    assert cost_calculation._load_config() == {"general": {"price_kwh": 0.35}}
+    assert len(logged_messages) == 1
+
+
+def test_run_tick(monkeypatch):
+    """
+    Test that run_tick() only fetches the due periods and logs the costs per period
+    """
+
+    class FixedDatetime(datetime):
+        """
+        Datetime with a fixed current time
+        """
+
+        @classmethod
+        def utcnow(cls):
+            return cls(2022, 3, 15, 6, 30, 0, 500)
+
+    fetched = []
+    logged = {}
+
+    def fake_fetch_aggregated(device, ranges):
+        fetched.append((device, sorted(ranges)))
+        if device == "empty":
+            return {period: (0.0, 0, 0) for period in ranges}
+        return {period: (1500.0, 100, 25) for period in ranges}
+
+    monkeypatch.setattr(cost_calculation, "datetime", FixedDatetime)
+    monkeypatch.setattr(cost_calculation, "check_cost_config", lambda: 0.3)
+    monkeypatch.setattr(cost_calculation.sf, "fetch_aggregated", fake_fetch_aggregated)
+    monkeypatch.setattr(
+        cost_calculation.sf, "cost_logging", lambda name, data: logged.update({name: data})
+    )
+    cost_calculation.run_tick(
+        [
+            (
+                "washer",
+                {"update_time": 10},
+                {"cost_day": True, "cost_month": 15, "cost_year": (15, 3)},
+            ),
+            (
+                "oven",
+                {"update_time": 10},
+                {"cost_day": False, "cost_month": 20, "cost_year": (15, 4)},
+            ),
+            (
+                "empty",
+                {"update_time": 10},
+                {"cost_day": True, "cost_month": None, "cost_year": None},
+            ),
+        ]
+    )
+
+    assert fetched == [("washer", ["day", "month", "year"]), ("empty", ["day"])]
+    assert sorted(logged) == ["washer_day", "washer_month", "washer_year"]
+    period_seconds = {"day": 1 * 86400, "month": 28 * 86400, "year": 365 * 86400}
+    for period, seconds in period_seconds.items():
+        data = logged[f"washer_{period}"]
+        max_values = seconds / 10
+        assert data["end_date"] == "2022-03-15 06:30:00"
+        assert data["sum_of_energy"] == 1.5
+        assert data["total_cost"] == pytest.approx(0.45)
+        assert data["error_rate_one"] == pytest.approx(25 * 100 / (100 + 25))
+        assert data["error_rate_two"] == pytest.approx((max_values - 100) * 100 / max_values)
+    assert logged["washer_month"]["start_date"] == "2022-02-15 06:30:00"
@@ -0,0 +1,187 @@
+"""
+Tests for support_functions.py
+"""
+import calendar
+from datetime import datetime
+
+import pytest
+from influxdb.resultset import ResultSet
+
+from source import support_functions
+from source.support_functions import (
+    aggregation_query,
+    sum_buckets_per_period,
+    fetch_aggregated,
+)
+
+END_DATE = datetime(2022, 3, 15, 6, 30, 0)
+START_DATES = {
+    "day": datetime(2022, 3, 14, 6, 30, 0),
+    "month": datetime(2022, 2, 15, 6, 30, 0),
+    "year": datetime(2021, 3, 15, 6, 30, 0),
+}
+START_EPOCHS = {
+    period: calendar.timegm(start_date.timetuple())
+    for period, start_date in START_DATES.items()
+}
+DAY = 86400
+
+
+def create_result(columns: list, values: list) -> ResultSet:
+    """
+    Create a ResultSet like the InfluxDB client returns for a daily aggregation
+    :return: ResultSet with one series
+    """
+    return ResultSet(
+        {
+            "statement_id": 0,
+            "series": [{"name": "census", "columns": columns, "values": values}],
+        }
+    )
+
+
+def test_aggregation_query_success():
+    """
+    Pure test for function aggregation_query() for successful measurements
+    """
+    result = aggregation_query("power", True, 23400)
+    assert result == (
+        'SELECT sum("energy_wh") AS energy_wh, count("fetch_success") AS count '
+        'FROM power."autogen"."census" '
+        "WHERE device=$device AND fetch_success=true "
+        "AND time >= $target_date AND time < $current_date "
+        "GROUP BY time(1d, 23400s) fill(none)"
+    )
+
+
+def test_aggregation_query_failed():
+    """
+    Pure test for function aggregation_query() for failed measurements
+    """
+    result = aggregation_query("power", False, 0)
+    assert result.startswith('SELECT count("fetch_success") AS count FROM')
+    assert "fetch_success=false" in result
+    assert "time >= $target_date AND time < $current_date" in result
+    assert result.endswith("GROUP BY time(1d, 0s) fill(none)")
+
+
+@pytest.mark.parametrize(
+    "bucket_time, expected",
+    [
+        (START_EPOCHS["day"], {"day": 1, "month": 1, "year": 1}),
+        (START_EPOCHS["day"] - DAY, {"day": 0, "month": 1, "year": 1}),
+        (START_EPOCHS["month"], {"day": 0, "month": 1, "year": 1}),
+        (START_EPOCHS["month"] - DAY, {"day": 0, "month": 0, "year": 1}),
+        (START_EPOCHS["year"], {"day": 0, "month": 0, "year": 1}),
+        (START_EPOCHS["year"] - DAY, {"day": 0, "month": 0, "year": 0}),
+    ],
+)
+def test_sum_buckets_per_period_boundaries(bucket_time, expected):
+    """
+    Test that a bucket is only added to the periods which start before or with it
+    """
+    result = sum_buckets_per_period(
+        create_result(["time", "energy_wh", "count"], [[bucket_time, 10.0, 4]]),
+        START_EPOCHS,
+    )
+    assert result == {
+        period: [10.0 * factor, 4 * factor] for period, factor in expected.items()
+    }
+
+
+def test_sum_buckets_per_period_empty_result():
+    """
+    Test that a result without series returns zero sums
+    """
+    result = sum_buckets_per_period(ResultSet({"statement_id": 0}), START_EPOCHS)
+    assert result == {period: [0.0, 0] for period in START_EPOCHS}
+
+
+def test_sum_buckets_per_period_null_energy():
+    """
+    Test that a bucket with null energy is counted without energy
+    """
+    result = sum_buckets_per_period(
+        create_result(
+            ["time", "energy_wh", "count"],
+            [[START_EPOCHS["day"], None, 3], [START_EPOCHS["month"], 5.0, 2]],
+        ),
+        START_EPOCHS,
+    )
+    assert result == {"day": [0.0, 3], "month": [5.0, 5], "year": [5.0, 5]}
+
+
+def test_sum_buckets_per_period_without_energy_column():
+    """
+    Test the result of failed measurements which has no energy column
+    """
+    result = sum_buckets_per_period(
+        create_result(
+            ["time", "count"],
+            [[START_EPOCHS["year"], 1], [START_EPOCHS["day"], 2]],
+        ),
+        START_EPOCHS,
+    )
+    assert result == {"day": [0.0, 2], "month": [0.0, 2], "year": [0.0, 3]}
+
+
+def test_fetch_aggregated(monkeypatch):
+    """
+    Test that fetch_aggregated() queries the widest range aligned to the end date and sums
+    the buckets per period
+    """
+    queries = []
+
+    class FakeConnection:  # pylint: disable=too-few-public-methods
+        """
+        Replacement for the database connection which returns fixed buckets
+        """
+
+        login_information = support_functions.login_information
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def query(self, query, bind_params=None, epoch=None):
+            """
+            Record the query and return one result for each statement
+            """
+            queries.append((query, bind_params, epoch))
+            return [
+                create_result(
+                    ["time", "energy_wh", "count"],
+                    [[START_EPOCHS["month"], 100.0, 8], [START_EPOCHS["day"], 20.0, 6]],
+                ),
+                create_result(["time", "count"], [[START_EPOCHS["day"], 2]]),
+            ]
+
+    monkeypatch.setattr(support_functions, "InfluxDBConnection", FakeConnection)
+    ranges = {
+        period: {"start_date": START_DATES[period], "end_date": END_DATE}
+        for period in ("day", "month")
+    }
+    result = fetch_aggregated("washer", ranges)
+    assert result == {"day": (20.0, 6, 2), "month": (120.0, 14, 2)}
+    query, bind_params, epoch = queries[0]
+    assert "GROUP BY time(1d, 23400s)" in query
+    assert bind_params == {
+        "device": "washer",
+        "target_date": "2022-02-15 06:30:00",
+        "current_date": "2022-03-15 06:30:00",
+    }
+    assert epoch == "s"
+
+
+def test_fetch_aggregated_different_end_dates():
+    """
+    Test that time ranges with different end dates are rejected
+    """
+    ranges = {
+        "day": {"start_date": START_DATES["day"], "end_date": END_DATE},
+        "month": {"start_date": START_DATES["month"], "end_date": START_DATES["day"]},
+    }
+    with pytest.raises(ValueError):
+        fetch_aggregated("washer", ranges)